@@ -196,11 +196,15 @@ class CephAdmin(BootstrapMixin, ShellMixin):
         Display cluster state by executing commands provided
         Just used for sanity.
 
+        All the commands are executed within a single cephadm shell session.
+
         Args:
             commands (List): list of commands
         """
-        for cmd in commands:
-            out, err = self.shell(args=[cmd])
+        results, err = self.shell_batch(commands, check_status=False)
+        for cmd, (out, rc) in zip(commands, results):
             logger.info(out)
-            if err:
-                logger.error(err)
+            if rc:
+                logger.error(f"{cmd} failed with exit status {rc}")
+        if err:
+            logger.error(err)
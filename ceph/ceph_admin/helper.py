@@ -2,21 +2,38 @@
 Contains helper functions that can used across the module.
 """
 import datetime
-import json
 import os
-import tempfile
+import shlex
+from collections import defaultdict
 from datetime import timedelta
 from os.path import dirname
+from textwrap import indent
 from time import sleep
+from uuid import uuid4
 
-from jinja2 import Template
+from jinja2 import Environment, FileSystemLoader
 
-from ceph.ceph import CommandFailed
-from ceph.utils import get_node_by_id, get_nodes_by_ids
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from ceph.ceph import CommandFailed, ResourceNotFoundError
+from ceph.parallel import parallel
+from ceph.utils import get_node_by_id
 from utility.log import Log
 from utility.utils import generate_self_signed_certificate
 
 LOG = Log(__name__)
+HEREDOC_DELIMITER = "CEPHCI_EOF"
+LOG_VALIDATION_ROLES = frozenset(["mon", "mgr", "osd", "rgw", "mds"])
+
+TEMPLATE_PATH = dirname(__file__) + "/jinja_templates/"
+
+# Templates are static, so compile them once and reuse across spec renders.
+TEMPLATE_ENV = Environment(
+    loader=FileSystemLoader(TEMPLATE_PATH), auto_reload=False, cache_size=-1
+)
 
 
 class UnknownSpecFound(Exception):
@@ -26,15 +43,28 @@ class UnknownSpecFound(Exception):
 class GenerateServiceSpec:
     """Creates the spec yaml file for deploying services and daemons using cephadm."""
 
-    COMMON_SERVICES = [
-        "mon",
-        "mgr",
-        "alertmanager",
-        "crash",
-        "grafana",
-        "node-exporter",
-        "prometheus",
-    ]
+    COMMON_SERVICES = frozenset(
+        [
+            "mon",
+            "mgr",
+            "alertmanager",
+            "crash",
+            "grafana",
+            "node-exporter",
+            "prometheus",
+        ]
+    )
+
+    RENDER_METHODS = {
+        "host": "generate_host_spec",
+        "osd": "generate_osd_spec",
+        "mds": "generate_mds_spec",
+        "nfs": "generate_nfs_spec",
+        "rgw": "generate_rgw_spec",
+        "snmp-gateway": "generate_snmp_spec",
+        "snmp-destination": "generate_snmp_dest_conf",
+        "ingress": "generate_ingress_spec",
+    }
 
     def __init__(self, node, cluster, specs):
         """
@@ -81,7 +111,7 @@ class GenerateServiceSpec:
         self.cluster = cluster
         self.node = node
         self.specs = specs
-        self.template_path = dirname(__file__) + "/jinja_templates/"
+        self._node_index = dict()
 
     @staticmethod
     def get_hostname(node):
@@ -123,6 +153,36 @@ class GenerateServiceSpec:
         label_set = set(node.role.role_list)
         return list(label_set)
 
+    def get_node(self, node_name):
+        """
+        Return node object for the given node ID
+
+        Nodes are resolved using get_node_by_id only once per node ID,
+        further lookups are served from the node index.
+
+        Args:
+            node_name (Str): node ID (ex., "node1")
+
+        Returns:
+            node (CephNode)
+        """
+        if node_name not in self._node_index:
+            self._node_index[node_name] = get_node_by_id(self.cluster, node_name)
+        return self._node_index[node_name]
+
+    def get_nodes(self, node_names):
+        """
+        Return list of node objects, skipping the unknown node IDs
+
+        Args:
+            node_names (List): node names
+
+        Returns:
+            list of nodes (List)
+        """
+        nodes = [self.get_node(node_name) for node_name in node_names]
+        return [node for node in nodes if node]
+
     def get_hostnames(self, node_names):
         """
         Return list of hostnames
@@ -133,8 +193,25 @@ class GenerateServiceSpec:
         Returns:
             list of hostanmes (List)
         """
-        nodes = get_nodes_by_ids(self.cluster, node_names)
-        return [node.hostname for node in nodes]
+        return [node.hostname for node in self.get_nodes(node_names)]
+
+    def _resolve_placement(self, spec):
+        """
+        Return a copy of the spec with placement nodes replaced by hostnames
+
+        The provided spec is left untouched, so that it can be rendered again.
+
+        Args:
+            spec (Dict): service spec config
+
+        Returns:
+            spec (Dict)
+        """
+        placement = dict(spec["placement"])
+        node_names = placement.pop("nodes", None)
+        if node_names:
+            placement["hosts"] = self.get_hostnames(node_names)
+        return {**spec, "placement": placement}
 
     def _get_template(self, service_type):
         """
@@ -146,10 +223,7 @@ class GenerateServiceSpec:
         Returns:
             template
         """
-        path = self.template_path + f"{service_type}.jinja"
-        with open(path) as fd:
-            template = fd.read()
-        return Template(template)
+        return TEMPLATE_ENV.get_template(f"{service_type}.jinja")
 
     def generate_host_spec(self, spec):
         """
@@ -176,20 +250,22 @@ class GenerateServiceSpec:
         address = spec.get("address")
         labels = spec.get("labels")
         for node_name in spec["nodes"]:
-            host = dict()
-            node = get_node_by_id(self.cluster, node_name)
-            host["hostname"] = self.get_hostname(node)
+            node = self.get_node(node_name)
+            if not node:
+                raise ResourceNotFoundError(f"Unknown {node_name} node name.")
+
+            host = {"hostname": self.get_hostname(node)}
             if address:
                 host["address"] = self.get_addr(node)
 
             if labels:
                 # Skipping client node, if only client label is attached
-                if len(node.role.role_list) == 1 and ["client"] == node.role.role_list:
+                if ["client"] == node.role.role_list:
                     return
 
-                if isinstance(labels, str) and labels == "apply-all-labels":
-                    labels = self.get_labels(node)
-                host["labels"] = labels
+                host["labels"] = (
+                    self.get_labels(node) if labels == "apply-all-labels" else labels
+                )
             hosts.append(host)
 
         return template.render(hosts=hosts)
@@ -227,9 +303,7 @@ class GenerateServiceSpec:
                     - node3
         """
         template = self._get_template("common_svc_template")
-        node_names = spec["placement"].pop("nodes", None)
-        if node_names:
-            spec["placement"]["hosts"] = self.get_hostnames(node_names)
+        spec = self._resolve_placement(spec)
 
         return template.render(spec=spec)
 
@@ -259,9 +333,7 @@ class GenerateServiceSpec:
 
         """
         template = self._get_template("osd")
-        node_names = spec["placement"].pop("nodes", None)
-        if node_names:
-            spec["placement"]["hosts"] = self.get_hostnames(node_names)
+        spec = self._resolve_placement(spec)
 
         return template.render(spec=spec)
 
@@ -292,9 +364,7 @@ class GenerateServiceSpec:
 
         """
         template = self._get_template("mds")
-        node_names = spec["placement"].pop("nodes", None)
-        if node_names:
-            spec["placement"]["hosts"] = self.get_hostnames(node_names)
+        spec = self._resolve_placement(spec)
 
         return template.render(spec=spec)
 
@@ -327,9 +397,7 @@ class GenerateServiceSpec:
         :Note: make sure pool is already created.
         """
         template = self._get_template("nfs")
-        node_names = spec["placement"].pop("nodes", None)
-        if node_names:
-            spec["placement"]["hosts"] = self.get_hostnames(node_names)
+        spec = self._resolve_placement(spec)
 
         return template.render(spec=spec)
 
@@ -378,11 +446,10 @@ class GenerateServiceSpec:
 
         """
         template = self._get_template("rgw")
-        node_names = spec["placement"].pop("nodes", None)
-        if node_names:
-            spec["placement"]["hosts"] = self.get_hostnames(node_names)
+        spec = self._resolve_placement(spec)
 
         if spec["spec"].get("rgw_frontend_ssl_certificate") == "create-cert":
+            spec["spec"] = dict(spec["spec"])
             subject = {
                 "common_name": spec["placement"]["hosts"][0],
                 "ip_address": self.cluster.get_node_by_hostname(
@@ -391,10 +458,7 @@ class GenerateServiceSpec:
             }
             key, cert, ca = generate_self_signed_certificate(subject=subject)
             pem = key + cert + ca
-            cert_value = "|\n" + pem
-            spec["spec"]["rgw_frontend_ssl_certificate"] = "\n    ".join(
-                cert_value.split("\n")
-            )
+            spec["spec"]["rgw_frontend_ssl_certificate"] = "|\n" + indent(pem, "    ")
             LOG.debug(pem)
 
         return template.render(spec=spec)
@@ -419,11 +483,12 @@ class GenerateServiceSpec:
                     snmp_v3_auth_password: mypassword
         """
         template = self._get_template("snmp")
+        spec = {**spec, "spec": dict(spec["spec"])}
         destination_node = spec["spec"].pop("snmp_destination", None)
-        node = get_node_by_id(self.cluster, destination_node)
+        node = self.get_node(destination_node)
         if destination_node:
             spec["spec"]["snmp_destination"] = self.get_addr(node) + ":162"
-        node_installer = get_node_by_id(self.cluster, "node1")
+        node_installer = self.get_node("node1")
         cmd = "cephadm shell ceph fsid"
         out, err = node_installer.exec_command(sudo=True, cmd=cmd)
         LOG.info(f"fsid: {out}")
@@ -459,7 +524,8 @@ class GenerateServiceSpec:
 
         """
         template = self._get_template("snmp_destination")
-        node = get_node_by_id(self.cluster, "node1")
+        spec = {**spec, "spec": dict(spec["spec"])}
+        node = self.get_node("node1")
         cmd = "cephadm shell ceph fsid"
         out, err = node.exec_command(sudo=True, cmd=cmd)
         LOG.info(f"fsid: {out}")
@@ -503,9 +569,7 @@ class GenerateServiceSpec:
 
         """
         template = self._get_template("ingress")
-        node_names = spec["placement"].pop("nodes", None)
-        if node_names:
-            spec["placement"]["hosts"] = self.get_hostnames(node_names)
+        spec = self._resolve_placement(spec)
 
         return template.render(spec=spec)
 
@@ -519,23 +583,13 @@ class GenerateServiceSpec:
         Returns:
             method (Func)
         """
-        render_definitions = {
-            "host": self.generate_host_spec,
-            "osd": self.generate_osd_spec,
-            "mds": self.generate_mds_spec,
-            "nfs": self.generate_nfs_spec,
-            "rgw": self.generate_rgw_spec,
-            "snmp-gateway": self.generate_snmp_spec,
-            "snmp-destination": self.generate_snmp_dest_conf,
-            "ingress": self.generate_ingress_spec,
-        }
-
-        try:
-            if service_type in self.COMMON_SERVICES:
-                return self.generate_generic_spec
-            return render_definitions[service_type]
-        except KeyError:
-            raise NotImplementedError
+        if service_type in self.COMMON_SERVICES:
+            return self.generate_generic_spec
+
+        method_name = self.RENDER_METHODS.get(service_type)
+        if method_name is None:
+            raise NotImplementedError(service_type)
+        return getattr(self, method_name)
 
     def create_spec_file(self):
         """
@@ -545,23 +599,17 @@ class GenerateServiceSpec:
             temp_filename (Str)
 
         """
-        spec_content = ""
+        spec_contents = []
         for spec in self.specs:
             method = self._get_render_method(spec["service_type"])
             if not method:
                 raise UnknownSpecFound(f"unknown spec found - {spec}")
-            spec_content += method(spec=spec)
+            spec_contents.append(method(spec=spec))
+        spec_content = "".join(spec_contents)
 
         LOG.info(f"Spec yaml file content:\n{spec_content}")
         # Create spec yaml file
-        temp_file = tempfile.NamedTemporaryFile(suffix=".yaml")
-        spec_file = self.node.node.remote_file(
-            sudo=True, file_name=temp_file.name, file_mode="w"
-        )
-        spec_file.write(spec_content)
-        spec_file.flush()
-
-        return temp_file.name
+        return write_remote_file(self.node, spec_content)
 
     def create_snmp_conf_file(self):
         """
@@ -571,20 +619,41 @@ class GenerateServiceSpec:
             temp_filename (Str)
 
         """
-        spec_content = ""
+        spec_contents = []
         for spec in self.specs:
             method = self._get_render_method(spec["service_type"])
             if not method:
                 raise UnknownSpecFound(f"unknown spec found - {spec}")
-            spec_content += method(spec=spec)
+            spec_contents.append(method(spec=spec))
+        spec_content = "".join(spec_contents)
         LOG.info(f"SNMP Conf file content:\n{spec_content}")
-        temp_file = tempfile.NamedTemporaryFile(suffix=".yaml")
-        conf_file = self.node.remote_file(
-            sudo=True, file_name=temp_file.name, file_mode="w"
-        )
-        conf_file.write(spec_content)
-        conf_file.flush()
-        return temp_file.name
+        return write_remote_file(self.node, spec_content)
+
+
+def write_remote_file(node, content, suffix=".yaml"):
+    """
+    Write the content to a new temporary file on the node and return file name
+
+    The file is created using a single remote command instead of an SFTP
+    session per file.
+
+    Args:
+        node (CephNode): node where the file to be created
+        content (Str): file content
+        suffix (Str): file name suffix
+
+    Returns:
+        temp_filename (Str)
+    """
+    file_name = f"/tmp/tmp{uuid4().hex}{suffix}"
+    if not content.endswith("\n"):
+        content += "\n"
+
+    node.exec_command(
+        sudo=True,
+        cmd=f"cat > {file_name} << '{HEREDOC_DELIMITER}'\n{content}{HEREDOC_DELIMITER}",
+    )
+    return file_name
 
 
 def create_ceph_config_file(node, config):
@@ -595,22 +664,12 @@ def create_ceph_config_file(node, config):
         temp_filename (Str)
 
     """
-    path = dirname(__file__) + "/jinja_templates/config.jinja"
-    with open(path) as fd:
-        template = fd.read()
-
-    conf_content = Template(template).render(config=config)
+    template = TEMPLATE_ENV.get_template("config.jinja")
+    conf_content = template.render(config=config)
 
     LOG.info(f"Conf yaml file content:\n{conf_content}")
     # Create conf yaml file
-    temp_file = tempfile.NamedTemporaryFile(suffix=".yaml")
-    conf_file = node.node.remote_file(
-        sudo=True, file_name=temp_file.name, file_mode="w"
-    )
-    conf_file.write(conf_content)
-    conf_file.flush()
-
-    return temp_file.name
+    return write_remote_file(node, conf_content)
 
 
 def get_cluster_state(cls, commands=None):
@@ -642,9 +701,12 @@ def get_cluster_state(cls, commands=None):
 
     __CLUSTER_STATE_COMMANDS.extend(commands)
 
-    for cmd in __CLUSTER_STATE_COMMANDS:
-        out, err = cls.shell(args=[cmd])
-        LOG.info("STDOUT:\n %s" % out)
+    results, err = cls.shell_batch(__CLUSTER_STATE_COMMANDS, check_status=False)
+    for cmd, (out, rc) in zip(__CLUSTER_STATE_COMMANDS, results):
+        LOG.info("CMD %s STDOUT:\n %s" % (cmd, out))
+        if rc:
+            LOG.error(f"{cmd} failed with exit status {rc}")
+    if err:
         LOG.error("STDERR:\n %s" % err)
 
 
@@ -658,7 +720,7 @@ def get_host_osd_map(cls):
         Dictionary with host names as keys and osds deployed as value list
     """
     out, _ = cls.shell(args=["ceph", "osd", "tree", "-f", "json"])
-    osd_obj = json.loads(out)
+    osd_obj = json_loads(out)
     osd_dict = {}
     for obj in osd_obj["nodes"]:
         if obj["type"] == "host":
@@ -678,16 +740,14 @@ def get_host_daemon_map(cls):
         list
     """
     out, _ = cls.shell(args=["ceph", "orch", "ps", "-f", "json"])
-    daemon_obj = json.loads(out)
-    daemon_dict = dict()
+    daemon_obj = json_loads(out)
+    daemon_dict = defaultdict(list)
     for daemon in daemon_obj:
-        daemon_name = daemon["daemon_type"] + "." + daemon["daemon_id"]
-        if daemon["hostname"] in daemon_dict.keys():
-            daemon_dict[daemon["hostname"]].append(daemon_name)
-        else:
-            daemon_dict[daemon["hostname"]] = [daemon_name]
+        daemon_dict[daemon["hostname"]].append(
+            f"{daemon['daemon_type']}.{daemon['daemon_id']}"
+        )
 
-    return daemon_dict
+    return dict(daemon_dict)
 
 
 def get_hosts_deployed(cls):
@@ -701,7 +761,7 @@ def get_hosts_deployed(cls):
     """
     out, _ = cls.shell(args=["ceph", "orch", "host", "ls", "-f", "json"])
     hosts = list()
-    host_obj = json.loads(out)
+    host_obj = json_loads(out)
     for host in host_obj:
         hosts.append(host["hostname"])
 
@@ -719,13 +779,10 @@ def file_or_path_exists(node, file_or_path):
         boolean
     """
     try:
-        out, _ = node.exec_command(cmd=f"ls -l {file_or_path}", sudo=True)
-        LOG.info(f"Output : {out}")
+        node.exec_command(cmd=f"test -e {shlex.quote(file_or_path)}", sudo=True)
         return True
-    except CommandFailed as err:
-        LOG.error(f"Error: {err}")
-
-    return False
+    except CommandFailed:
+        return False
 
 
 def monitoring_file_existence(node, file_or_path, file_exist=True, timeout=180):
@@ -748,6 +805,45 @@ def monitoring_file_existence(node, file_or_path, file_exist=True, timeout=180):
     return False
 
 
+def _get_expected_log_files(daemons, log_file_path):
+    """Return the log files expected for the daemons of LOG_VALIDATION_ROLES.
+
+    Args:
+        daemons: list of daemon names (ex., "mon.node1")
+        log_file_path: ceph log directory of the cluster
+
+    Returns:
+        list of absolute file paths
+    """
+    files = list()
+    for daemon in daemons:
+        role = daemon.partition(".")[0]
+        if role not in LOG_VALIDATION_ROLES:
+            continue
+        name = f"ceph-client.{daemon}.log" if role == "rgw" else f"ceph-{daemon}.log"
+        files.append(os.path.join(log_file_path, name))
+    return files
+
+
+def _get_missing_files(node, files):
+    """Return the node along with the files which are not present on it.
+
+    All the files are listed using a single remote command.
+
+    Args:
+        node: node object where files should be exists
+        files: list of absolute file paths
+
+    Returns:
+        tuple of node and list of missing files
+    """
+    LOG.info(f"Verifying existence of log files {files} in host {node.hostname}")
+    cmd = "ls -1 " + " ".join(shlex.quote(f) for f in files)
+    out, _ = node.exec_command(cmd=cmd, sudo=True, check_ec=False)
+    present = set(out.split())
+    return node, [f for f in files if f not in present]
+
+
 def validate_log_file_after_enable(cls):
     """
     Verify generation of log files in default log directory when logging not enabled.
@@ -758,39 +854,33 @@ def validate_log_file_after_enable(cls):
     Returns:
         boolean
     """
-    out, _ = cls.shell(args=["ceph", "config", "set", "global", "log_to_file", "true"])
-    out, _ = cls.shell(args=["ceph", "fsid"])
-    fsid = out.strip()
+    results, _ = cls.shell_batch(
+        ["ceph config set global log_to_file true", "ceph fsid"]
+    )
+    fsid = results[-1][0].strip()
     log_file_path = os.path.join("/var/log/ceph", fsid)
     daemon_dict = get_host_daemon_map(cls)
-    roles_to_validate = ["mon", "mgr", "osd", "rgw", "mds"]
-
-    daemon_valid = {
-        k: [val for val in v if val.split(".")[0] in roles_to_validate]
-        for (k, v) in daemon_dict.items()
-    }
 
-    for node in cls.cluster.get_nodes():
-        try:
-            if node.hostname not in daemon_valid.keys():
-                continue
-            daemons = daemon_valid[node.hostname]
-            for daemon in daemons:
-                file = os.path.join(log_file_path, f"ceph-{daemon}.log")
-                if "rgw" in daemon:
-                    file = os.path.join(log_file_path, f"ceph-client.{daemon}.log")
-                LOG.info(
-                    f"Verifying existence of log file {file} in host {node.hostname}"
+    files_per_host = dict()
+    for hostname, daemons in daemon_dict.items():
+        files = _get_expected_log_files(daemons, log_file_path)
+        if files:
+            files_per_host[hostname] = files
+
+    nodes = [n for n in cls.cluster.get_nodes() if n.hostname in files_per_host]
+    # All hosts are checked, so that every missing log file gets reported
+    logs_present = True
+    with parallel() as p:
+        for node in nodes:
+            p.spawn(_get_missing_files, node, files_per_host[node.hostname])
+
+        for node, missing in p:
+            if missing:
+                LOG.error(
+                    f"Logs {missing} are not present in the node {node.ip_address}"
                 )
-                file_exists = file_or_path_exists(node, file)
-                if not file_exists:
-                    LOG.error(
-                        f"Log for {daemon} is not present in the node {node.ip_address}"
-                    )
-                    return False
+                logs_present = False
+                continue
             LOG.info(f"Log verification on node {node.ip_address} successful")
-        except CommandFailed as err:
-            LOG.error("Error: %s" % err)
-            return False
 
-    return True
+    return logs_present
@@ -1,7 +1,10 @@
 """Interface to cephadm shell CLI."""
+import re
+import shlex
 from copy import deepcopy
 from typing import Dict, List
 
+from ceph.ceph import CommandFailed
 from utility.log import Log
 
 from .common import config_dict_to_string
@@ -9,6 +12,8 @@ from .typing_ import CephAdmProtocol
 
 LOG = Log(__name__)
 BASE_CMD = ["cephadm", "-v", "shell"]
+BATCH_SEP = "__SEP__"
+BATCH_SEP_REGEX = re.compile(rf"\n?{BATCH_SEP}(\d+)__\n")
 
 
 class ShellMixin:
@@ -56,3 +61,53 @@ class ShellMixin:
         if isinstance(out, tuple):
             LOG.debug(out[0])
         return out
+
+    def shell_batch(
+        self: CephAdmProtocol,
+        commands: List[str],
+        base_cmd_args: Dict = None,
+        check_status: bool = True,
+        timeout: int = 600,
+    ):
+        """
+        Run multiple ceph commands within a single cephadm shell session.
+
+        Every cephadm shell call spins up a new container, hence independent
+        commands are joined into one bash script and their outputs are split
+        using a sentinel carrying the exit status of each command. The stderr
+        of each command is redirected to its stdout, so that error messages
+        stay with the command which produced them.
+
+        Args:
+            commands (List): list of commands
+            base_cmd_args (Dict)): cephadm base command options
+            check_status (Bool): raise if any of the commands failed
+            timeout (Int): Maximum time allowed for execution of each command.
+
+        Returns:
+            results (List), err (Str) list of (output, exit status) tuples
+            in the order of commands and stderr of the cephadm shell session
+
+        """
+        script = "".join(
+            f"{{\n{cmd}\n}} 2>&1\necho {BATCH_SEP}$?__\n" for cmd in commands
+        )
+        out, err = self.shell(
+            args=["bash", "-c", shlex.quote(script)],
+            base_cmd_args=base_cmd_args,
+            check_status=check_status,
+            timeout=timeout * len(commands),
+        )
+
+        # re.split yields [out1, rc1, out2, rc2, ..., trailing]
+        parts = BATCH_SEP_REGEX.split(out)
+        results = [
+            (parts[idx], int(parts[idx + 1])) for idx in range(0, len(parts) - 1, 2)
+        ]
+
+        if check_status:
+            failed = [cmd for cmd, (_, rc) in zip(commands, results) if rc != 0]
+            if failed or len(results) != len(commands):
+                raise CommandFailed(f"Failed to execute {failed or commands}: {err}")
+
+        return results, err
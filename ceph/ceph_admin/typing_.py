@@ -38,6 +38,15 @@ class CephAdmProtocol(Protocol):
     ):
         ...
 
+    def shell_batch(
+        self,
+        commands: List[str],
+        base_cmd_args: Dict = None,
+        check_status: bool = True,
+        timeout: int = 600,
+    ):
+        ...
+
 
 class OrchProtocol(CephAdmProtocol, Protocol):
     """Orch protocol object for supporting static duck typing hints."""
@@ -0,0 +1,170 @@
+import json
+
+import mock
+import pytest
+
+from ceph.ceph import ResourceNotFoundError
+from ceph.ceph_admin.helper import (
+    GenerateServiceSpec,
+    get_cluster_state,
+    validate_log_file_after_enable,
+    write_remote_file,
+)
+
+
+def mock_node(name):
+    node = mock.Mock()
+    node.hostname = f"ceph-{name}"
+    node.shortname = f"ceph-{name}"
+    node.ip_address = "10.0.0.1"
+    node.role.role_list = ["mon", "mgr"]
+    return node
+
+
+class TestGenerateServiceSpec:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self._spec = GenerateServiceSpec(node=None, cluster=None, specs=[])
+
+    @mock.patch("ceph.ceph_admin.helper.get_node_by_id")
+    def test_get_hostnames(self, get_node_mock):
+        get_node_mock.side_effect = lambda cluster, name: mock_node(name)
+        assert self._spec.get_hostnames(["node1", "node2"]) == [
+            "ceph-node1",
+            "ceph-node2",
+        ]
+        assert self._spec.get_hostnames(["node2", "node1"]) == [
+            "ceph-node2",
+            "ceph-node1",
+        ]
+        assert get_node_mock.call_count == 2
+
+    @mock.patch("ceph.ceph_admin.helper.get_node_by_id")
+    def test_get_hostnames_unknown_node(self, get_node_mock):
+        get_node_mock.return_value = None
+        assert self._spec.get_hostnames(["node9"]) == []
+
+    @mock.patch("ceph.ceph_admin.helper.get_node_by_id")
+    def test_generate_host_spec(self, get_node_mock):
+        nodes = {"node1": mock_node("node1"), "node2": mock_node("node2")}
+        nodes["node2"].role.role_list = ["osd"]
+        get_node_mock.side_effect = lambda cluster, name: nodes.get(name)
+        spec = {
+            "service_type": "host",
+            "address": True,
+            "labels": "apply-all-labels",
+            "nodes": ["node1", "node2"],
+        }
+        content = self._spec.generate_host_spec(spec)
+        assert "hostname: ceph-node1" in content
+        assert "hostname: ceph-node2" in content
+        assert content.count("osd") == 1
+
+    @mock.patch("ceph.ceph_admin.helper.get_node_by_id")
+    def test_generate_host_spec_unknown_node(self, get_node_mock):
+        get_node_mock.side_effect = lambda cluster, name: (
+            None if name == "node9" else mock_node(name)
+        )
+        spec = {"service_type": "host", "nodes": ["node1", "node9"]}
+        with pytest.raises(ResourceNotFoundError, match="node9"):
+            self._spec.generate_host_spec(spec)
+
+    @mock.patch("ceph.ceph_admin.helper.get_node_by_id")
+    def test_generate_generic_spec_keeps_config(self, get_node_mock):
+        get_node_mock.side_effect = lambda cluster, name: mock_node(name)
+        spec = {"service_type": "mon", "placement": {"nodes": ["node1", "node2"]}}
+        content = self._spec.generate_generic_spec(spec)
+        assert "ceph-node1" in content
+        assert spec["placement"] == {"nodes": ["node1", "node2"]}
+        assert self._spec.generate_generic_spec(spec) == content
+
+    def test_get_render_method(self):
+        assert self._spec._get_render_method("mon") == self._spec.generate_generic_spec
+        assert self._spec._get_render_method("osd") == self._spec.generate_osd_spec
+        with pytest.raises(NotImplementedError):
+            self._spec._get_render_method("unknown")
+
+
+def test_write_remote_file():
+    node = mock.Mock()
+    file_name = write_remote_file(node, "service_type: mon")
+    assert file_name.startswith("/tmp/") and file_name.endswith(".yaml")
+    cmd = node.exec_command.call_args.kwargs["cmd"]
+    assert cmd.startswith(f"cat > {file_name} << ")
+    assert "\nservice_type: mon\n" in cmd
+    assert node.exec_command.call_count == 1
+
+
+@mock.patch("ceph.ceph_admin.helper.LOG")
+def test_get_cluster_state_with_failed_command(log_mock):
+    cls = mock.Mock()
+    cls.shell_batch.side_effect = lambda commands, check_status: (
+        [
+            ("out", 22 if cmd == "ceph orch ls -f json-pretty" else 0)
+            for cmd in commands
+        ],
+        "",
+    )
+    get_cluster_state(cls, ["ceph fs ls"])
+    commands = cls.shell_batch.call_args.args[0]
+    assert cls.shell_batch.call_args.kwargs["check_status"] is False
+    assert commands[-1] == "ceph fs ls"
+    assert log_mock.info.call_count == len(commands)
+    log_mock.error.assert_called_once_with(
+        "ceph orch ls -f json-pretty failed with exit status 22"
+    )
+
+
+def mock_cephadm(nodes):
+    daemons = [
+        {"hostname": "ceph-node1", "daemon_type": "mon", "daemon_id": "ceph-node1"},
+        {"hostname": "ceph-node1", "daemon_type": "crash", "daemon_id": "ceph-node1"},
+        {"hostname": "ceph-node2", "daemon_type": "osd", "daemon_id": "0"},
+        {"hostname": "ceph-node2", "daemon_type": "rgw", "daemon_id": "foo.ceph-node2"},
+    ]
+    cls = mock.Mock()
+    cls.shell_batch.return_value = [("", 0), ("fsid\n", 0)], ""
+    cls.shell.return_value = json.dumps(daemons), ""
+    cls.cluster.get_nodes.return_value = nodes
+    return cls
+
+
+def mock_log_node(name, missing=None):
+    def exec_command(cmd, **kwargs):
+        files = cmd.split()[2:]
+        return "\n".join(f for f in files if f != missing), ""
+
+    node = mock_node(name)
+    node.exec_command.side_effect = exec_command
+    return node
+
+
+class TestValidateLogFileAfterEnable:
+    def test_all_files_present(self):
+        nodes = [mock_log_node("node1"), mock_log_node("node2")]
+        assert validate_log_file_after_enable(mock_cephadm(nodes))
+        cmd = nodes[1].exec_command.call_args.kwargs["cmd"]
+        assert cmd == (
+            "ls -1 /var/log/ceph/fsid/ceph-osd.0.log "
+            "/var/log/ceph/fsid/ceph-client.rgw.foo.ceph-node2.log"
+        )
+        assert nodes[0].exec_command.call_count == 1
+
+    @mock.patch("ceph.ceph_admin.helper.LOG")
+    def test_missing_file(self, log_mock):
+        missing = "/var/log/ceph/fsid/ceph-osd.0.log"
+        nodes = [mock_log_node("node1"), mock_log_node("node2", missing)]
+        nodes[1].ip_address = "10.0.0.2"
+        assert not validate_log_file_after_enable(mock_cephadm(nodes))
+        log_mock.error.assert_called_once_with(
+            f"Logs {[missing]} are not present in the node 10.0.0.2"
+        )
+
+    @mock.patch("ceph.ceph_admin.helper.LOG")
+    def test_missing_files_on_all_hosts(self, log_mock):
+        nodes = [
+            mock_log_node("node1", "/var/log/ceph/fsid/ceph-mon.ceph-node1.log"),
+            mock_log_node("node2", "/var/log/ceph/fsid/ceph-osd.0.log"),
+        ]
+        assert not validate_log_file_after_enable(mock_cephadm(nodes))
+        assert log_mock.error.call_count == 2
@@ -0,0 +1,37 @@
+import pytest
+
+from ceph.ceph import CommandFailed
+from ceph.ceph_admin.shell import ShellMixin
+
+
+class MockShellMixinTest(ShellMixin):
+    def __init__(self, out):
+        self.out = out
+        self.calls = []
+
+    def shell(self, args, **kwargs):
+        self.calls.append(args)
+        self.kwargs = kwargs
+        return self.out, ""
+
+
+class TestShellMixin:
+    def test_shell_batch(self):
+        shell = MockShellMixinTest("a\nb\n__SEP__0__\nc__SEP__0__\n")
+        results, err = shell.shell_batch(["ceph status", "ceph mon stat"])
+        assert results == [("a\nb", 0), ("c", 0)]
+        assert err == ""
+        assert len(shell.calls) == 1
+        assert shell.calls[0][:2] == ["bash", "-c"]
+        assert "{\nceph status\n} 2>&1" in shell.calls[0][2]
+        assert shell.kwargs["timeout"] == 1200
+
+    def test_shell_batch_without_check_status(self):
+        shell = MockShellMixinTest("__SEP__2__\nok\n__SEP__0__\n")
+        results, _ = shell.shell_batch(["ceph fs ls", "ceph fsid"], check_status=False)
+        assert results == [("", 2), ("ok", 0)]
+
+    def test_shell_batch_failure(self):
+        shell = MockShellMixinTest("__SEP__1__\n")
+        with pytest.raises(CommandFailed):
+            shell.shell_batch(["ceph fs ls"])